@@ -1,188 +1,191 @@
 import json
 from datetime import datetime, timedelta
-from shared.database import DynamoDB
+from shared.database import DynamoDB, ESTADOS_ACTIVOS, ESTADO_ENTREGADO
+from shared.retry import ThrottledError, DeadlineExceededError, begin_invocation, retry_stats
+from shared.responses import respuesta, parse_fields, project
 
 dynamodb = DynamoDB()
 
+# Atributos de claves e índices que no se muestran en el dashboard
+ATRIBUTOS_INTERNOS = {'PK', 'SK', 'activeKey', 'activeStatus', 'createdDay', 'countedInTotal'}
+
+def headers_reintentos():
+    """
+    Expone los contadores de reintentos y throttles de la invocación
+    (begin_invocation los reinicia al entrar al handler)
+    """
+    totales = retry_stats.totals()
+    if totales['retries'] or totales['throttles']:
+        print(f"AWS retry stats: {json.dumps(retry_stats.snapshot())}")
+    return {
+        'X-Aws-Calls': str(totales['calls']),
+        'X-Aws-Retries': str(totales['retries']),
+        'X-Aws-Throttles': str(totales['throttles'])
+    }
+
+def respuesta_error(e):
+    """
+    Throttling y deadlines se devuelven como 503 para que el cliente reintente
+    más tarde, en lugar de mostrar ceros falsos
+    """
+    headers = headers_reintentos()
+    if isinstance(e, (ThrottledError, DeadlineExceededError)):
+        headers['Retry-After'] = '1'
+        return respuesta(503, {'error': str(e), 'retryable': True}, headers)
+    return respuesta(500, {'error': str(e)}, headers)
+
+def calcular_campos(calculos, fields):
+    """
+    Calcula solo las claves pedidas en fields (todas si no hay proyección);
+    las rutas anidadas se recortan después con project
+    """
+    pedidas = {f.split('.')[0] for f in fields} if fields else set(calculos)
+    return {clave: calculo() for clave, calculo in calculos.items() if clave in pedidas}
+
 def obtener_resumen(event, context):
     """
     Obtiene resumen general para el dashboard
     """
+    begin_invocation(context)
+    
     try:
-        tenant_id = event.get('queryStringParameters', {}).get('tenantId', 'pardos')
-        
-        # Obtener métricas básicas
-        total_pedidos = obtener_total_pedidos(tenant_id)
-        pedidos_hoy = obtener_pedidos_hoy(tenant_id)
-        pedidos_activos = obtener_pedidos_activos(tenant_id)
-        tiempo_promedio = obtener_tiempo_promedio(tenant_id)
+        tenant_id = (event.get('queryStringParameters') or {}).get('tenantId', 'pardos')
+        fields = parse_fields(event)
         
-        resumen = {
-            'totalPedidos': total_pedidos,
-            'pedidosHoy': pedidos_hoy,
-            'pedidosActivos': pedidos_activos,
-            'tiempoPromedioEntrega': tiempo_promedio,
-            'ultimaActualizacion': datetime.utcnow().isoformat()
-        }
+        # Obtener métricas básicas (solo las pedidas en fields=)
+        resumen = calcular_campos({
+            'totalPedidos': lambda: obtener_total_pedidos(tenant_id),
+            'pedidosHoy': lambda: obtener_pedidos_hoy(tenant_id),
+            'pedidosActivos': lambda: obtener_pedidos_activos(tenant_id),
+            'tiempoPromedioEntrega': lambda: obtener_tiempo_promedio(tenant_id),
+            'ultimaActualizacion': lambda: datetime.utcnow().isoformat()
+        }, fields)
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps(resumen)
-        }
+        return respuesta(200, project(resumen, fields), headers_reintentos())
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        return respuesta_error(e)
 
 def obtener_metricas(event, context):
     """
     Obtiene métricas detalladas para gráficos
     """
+    begin_invocation(context)
+    
     try:
-        tenant_id = event.get('queryStringParameters', {}).get('tenantId', 'pardos')
+        tenant_id = (event.get('queryStringParameters') or {}).get('tenantId', 'pardos')
+        fields = parse_fields(event)
         
-        metricas = {
-            'pedidosPorEstado': obtener_pedidos_por_estado(tenant_id),
-            'tiemposPorEtapa': obtener_tiempos_por_etapa(tenant_id),
-            'pedidosUltimaSemana': obtener_pedidos_ultima_semana(tenant_id),
-            'productosPopulares': obtener_productos_populares(tenant_id)
-        }
+        metricas = calcular_campos({
+            'pedidosPorEstado': lambda: obtener_pedidos_por_estado(tenant_id),
+            'tiemposPorEtapa': lambda: obtener_tiempos_por_etapa(tenant_id),
+            'pedidosUltimaSemana': lambda: obtener_pedidos_ultima_semana(tenant_id),
+            'productosPopulares': lambda: obtener_productos_populares(tenant_id)
+        }, fields)
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps(metricas)
-        }
+        return respuesta(200, project(metricas, fields), headers_reintentos())
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        return respuesta_error(e)
 
 def obtener_pedidos(event, context):
     """
-    Obtiene lista de pedidos para el dashboard - CORREGIDO
+    Obtiene lista de pedidos para el dashboard: los activos (índice sparse) o,
+    con desde/hasta, los creados en ese rango (índice por fecha).
+    fields= se aplica a cada pedido, p. ej. fields=orderId,status,items.name;
+    los atributos de primer nivel van en la ProjectionExpression y las etapas
+    solo se consultan si se piden
     """
+    begin_invocation(context)
+    
     try:
-        tenant_id = event.get('queryStringParameters', {}).get('tenantId', 'pardos')
-        limit = int(event.get('queryStringParameters', {}).get('limit', 50))
+        params = event.get('queryStringParameters') or {}
+        tenant_id = params.get('tenantId', 'pardos')
+        limit = int(params.get('limit', 50))
+        fields = parse_fields(event)
+        campos = campos_de_pedido(fields)
         
-        # NOTA: Esta función necesita acceso a la tabla de api-clientes
-        # Por ahora devolverá datos de ejemplo hasta que se integre con api-clientes
+        if params.get('desde') or params.get('hasta'):
+            desde, hasta = rango_fechas(params)
+            response = dynamodb.query_orders_between(tenant_id, desde, hasta, fields=campos, limit=limit)
+        else:
+            response = dynamodb.query_active_orders(tenant_id, fields=campos, limit=limit)
         
-        # Datos de ejemplo para demostración
-        pedidos_ejemplo = [
-            {
-                'orderId': 'o123456789',
-                'customerId': 'c1', 
-                'status': 'COOKING',
-                'total': 62.90,
-                'items': [
-                    {'name': 'Pollo a la brasa', 'price': 45.90, 'quantity': 1},
-                    {'name': 'Inca Kola 1L', 'price': 8.50, 'quantity': 2}
-                ],
-                'createdAt': '2025-11-10T04:29:43.856279',
-                'etapas': [
-                    {'stepName': 'COOKING', 'status': 'IN_PROGRESS', 'startedAt': '2025-11-10T04:29:43.856279'},
-                    {'stepName': 'PACKAGING', 'status': 'IN_PROGRESS', 'startedAt': '2025-11-10T04:31:19.195930'}
-                ]
-            }
-        ]
+        pedidos = [armar_pedido(tenant_id, item, fields) for item in response['Items']]
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'pedidos': pedidos_ejemplo,
-                'total': len(pedidos_ejemplo),
-                'message': 'Datos de ejemplo - Integrar con api-clientes para datos reales'
-            })
-        }
+        return respuesta(200, {
+            'pedidos': project(pedidos, fields),
+            'total': len(pedidos)
+        }, headers_reintentos())
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        return respuesta_error(e)
+
+def campos_de_pedido(fields):
+    """
+    Campos a proyectar en DynamoDB: orderId sale de la PK y etapas de la tabla
+    de pasos, así que se reemplazan por PK
+    """
+    if fields is None:
+        return None
+    return [f for f in fields if f.split('.')[0] not in ('orderId', 'etapas')] + ['PK']
+
+def rango_fechas(params):
+    # desde/hasta aceptan fecha (YYYY-MM-DD) o fecha y hora ISO en UTC
+    hoy = datetime.utcnow().date().isoformat()
+    desde = params.get('desde') or hoy
+    hasta = params.get('hasta') or hoy
+    if len(hasta) == 10:
+        hasta += 'T23:59:59.999999'
+    return desde, hasta
+
+def armar_pedido(tenant_id, item, fields):
+    order_id = item['PK'].split('#', 3)[3]
+    pedido = {k: v for k, v in item.items() if k not in ATRIBUTOS_INTERNOS}
+    pedido['orderId'] = order_id
+    
+    pedidas = [f for f in fields if f.split('.')[0] == 'etapas'] if fields else ['etapas']
+    if pedidas:
+        # etapas completo gana sobre etapas.x; si no, se proyectan solo las hijas
+        hijas = None if 'etapas' in pedidas else [f.split('.', 1)[1] for f in pedidas]
+        etapas = obtener_etapas_pedido(tenant_id, order_id, fields=hijas)
+        pedido['etapas'] = [{k: v for k, v in e.items() if k not in ATRIBUTOS_INTERNOS} for e in etapas]
+    
+    return pedido
 
 # Funciones auxiliares actualizadas
 def obtener_total_pedidos(tenant_id):
-    try:
-        response = dynamodb.query(
-            table_name='orders',
-            key_condition='PK = :pk AND SK = :sk',
-            expression_values={
-                ':pk': f"TENANT#{tenant_id}#ORDER",
-                ':sk': 'INFO'
-            },
-            select='COUNT'
-        )
-        return response.get('Count', 0)
-    except:
-        return 0
+    # Contador por tenant que mantienen registrar_pedido y el backfill
+    return dynamodb.get_order_count(tenant_id)
 
 def obtener_pedidos_hoy(tenant_id):
-    try:
-        hoy = datetime.utcnow().date().isoformat()
-        response = dynamodb.query(
-            table_name='orders',
-            key_condition='PK = :pk AND SK = :sk',
-            expression_values={
-                ':pk': f"TENANT#{tenant_id}#ORDER", 
-                ':sk': 'INFO'
-            }
-        )
-        
-        pedidos_hoy = 0
-        for pedido in response.get('Items', []):
-            if pedido.get('createdAt', '').startswith(hoy):
-                pedidos_hoy += 1
-                
-        return pedidos_hoy
-    except:
-        return 0
+    hoy = datetime.utcnow().date().isoformat()
+    response = dynamodb.query_orders_between(tenant_id, hoy, f"{hoy}T23:59:59.999999", select='COUNT')
+    return response['Count']
 
 def obtener_pedidos_activos(tenant_id):
-    try:
-        response = dynamodb.query(
-            table_name='orders',
-            key_condition='PK = :pk AND SK = :sk',
-            expression_values={
-                ':pk': f"TENANT#{tenant_id}#ORDER",
-                ':sk': 'INFO'
-            }
-        )
-        
-        activos = 0
-        estados_activos = ['CREATED', 'COOKING', 'PACKAGING', 'DELIVERY']
-        for pedido in response.get('Items', []):
-            if pedido.get('status') in estados_activos:
-                activos += 1
-                
-        return activos
-    except:
-        return 0
+    # El índice sparse solo contiene pedidos no terminales
+    response = dynamodb.query_active_orders(tenant_id, select='COUNT')
+    return response['Count']
 
 def obtener_pedidos_por_estado(tenant_id):
-    try:
-        response = dynamodb.query(
-            table_name='orders',
-            key_condition='PK = :pk AND SK = :sk',
-            expression_values={
-                ':pk': f"TENANT#{tenant_id}#ORDER",
-                ':sk': 'INFO'
-            }
-        )
+    """
+    Los estados activos cuentan todos los pedidos en curso (índice sparse, sin
+    importar cuándo se crearon); entregadosHoy cuenta solo los pedidos creados
+    hoy (UTC) que ya se entregaron, para no recorrer todo el historial
+    """
+    distribucion = {estado: 0 for estado in ESTADOS_ACTIVOS}
+    
+    activos = dynamodb.query_active_orders(tenant_id, fields=['status'])
+    for pedido in activos['Items']:
+        estado = pedido.get('status', 'CREATED')
+        distribucion[estado] = distribucion.get(estado, 0) + 1
+    
+    hoy = datetime.utcnow().date().isoformat()
+    de_hoy = dynamodb.query_orders_between(tenant_id, hoy, f"{hoy}T23:59:59.999999", fields=['status'])
+    distribucion['entregadosHoy'] = sum(1 for p in de_hoy['Items'] if p.get('status') == ESTADO_ENTREGADO)
         
-        distribucion = {'CREATED': 0, 'COOKING': 0, 'PACKAGING': 0, 'DELIVERY': 0, 'DELIVERED': 0}
-        for pedido in response.get('Items', []):
-            estado = pedido.get('status', 'CREATED')
-            distribucion[estado] = distribucion.get(estado, 0) + 1
-            
-        return distribucion
-    except:
-        return {'CREATED': 0, 'COOKING': 0, 'PACKAGING': 0, 'DELIVERY': 0, 'DELIVERED': 0}
+    return distribucion
 
 def obtener_tiempos_por_etapa(tenant_id):
     # Por ahora valores estáticos, se puede implementar cálculo real
@@ -207,17 +210,15 @@ def obtener_productos_populares(tenant_id):
 def obtener_tiempo_promedio(tenant_id):
     return 45  # minutos
 
-def obtener_etapas_pedido(tenant_id, order_id):
-    try:
-        response = dynamodb.query(
-            table_name='steps',
-            key_condition='PK = :pk AND begins_with(SK, :sk)',
-            expression_values={
-                ':pk': f"TENANT#{tenant_id}#ORDER#{order_id}",
-                ':sk': 'STEP#'
-            }
-        )
-        return response.get('Items', [])
-    except:
-        return []
+def obtener_etapas_pedido(tenant_id, order_id, fields=None):
+    response = dynamodb.query(
+        table_name='steps',
+        key_condition_expression='PK = :pk AND begins_with(SK, :sk)',
+        expression_attribute_values={
+            ':pk': f"TENANT#{tenant_id}#ORDER#{order_id}",
+            ':sk': 'STEP#'
+        },
+        fields=fields
+    )
+    return response.get('Items', [])
 
@@ -1,13 +1,17 @@
 import json
 import boto3
+from botocore.exceptions import ClientError
 from datetime import datetime
-from shared.database import DynamoDB
+from shared.database import DynamoDB, ESTADOS_ACTIVOS, ESTADO_ENTREGADO, ETAPA_FINAL, active_order_attributes
 from shared.events import EventBridge
+from shared.retry import begin_invocation
 
 dynamodb = DynamoDB()
 events = EventBridge()
 
 def cooking_stage(event, context):
+    begin_invocation(context)
+    
     try:
         order_id = event.get('orderId')
         tenant_id = event.get('tenantId', 'pardos')
@@ -16,6 +20,7 @@ def cooking_stage(event, context):
         print(f"Iniciando COOKING para orden: {order_id}")
         
         registrar_etapa(tenant_id, order_id, 'COOKING', 'IN_PROGRESS')
+        actualizar_estado_pedido(tenant_id, order_id, 'COOKING')
         
         events.publish_event(
             source="pardos.etapas",
@@ -36,6 +41,7 @@ def cooking_stage(event, context):
             'status': 'COMPLETED',
             'message': 'Cooking stage completed',
             'orderId': order_id,
+            'tenantId': tenant_id,
             'stage': 'COOKING',
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -48,6 +54,8 @@ def cooking_stage(event, context):
         }
 
 def packaging_stage(event, context):
+    begin_invocation(context)
+    
     try:
         order_id = event.get('orderId')
         tenant_id = event.get('tenantId', 'pardos')
@@ -57,6 +65,7 @@ def packaging_stage(event, context):
         
         completar_etapa_automatica(tenant_id, order_id, 'COOKING')
         registrar_etapa(tenant_id, order_id, 'PACKAGING', 'IN_PROGRESS')
+        actualizar_estado_pedido(tenant_id, order_id, 'PACKAGING')
         
         events.publish_event(
             source="pardos.etapas",
@@ -77,6 +86,7 @@ def packaging_stage(event, context):
             'status': 'COMPLETED',
             'message': 'Packaging stage completed',
             'orderId': order_id,
+            'tenantId': tenant_id,
             'stage': 'PACKAGING',
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -89,6 +99,8 @@ def packaging_stage(event, context):
         }
 
 def delivery_stage(event, context):
+    begin_invocation(context)
+    
     try:
         order_id = event.get('orderId')
         tenant_id = event.get('tenantId', 'pardos')
@@ -98,6 +110,7 @@ def delivery_stage(event, context):
         
         completar_etapa_automatica(tenant_id, order_id, 'PACKAGING')
         registrar_etapa(tenant_id, order_id, 'DELIVERY', 'IN_PROGRESS')
+        actualizar_estado_pedido(tenant_id, order_id, 'DELIVERY')
         
         events.publish_event(
             source="pardos.etapas",
@@ -118,6 +131,7 @@ def delivery_stage(event, context):
             'status': 'COMPLETED',
             'message': 'Delivery stage completed',
             'orderId': order_id,
+            'tenantId': tenant_id,
             'stage': 'DELIVERY',
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -130,6 +144,8 @@ def delivery_stage(event, context):
         }
 
 def delivered_stage(event, context):
+    begin_invocation(context)
+    
     try:
         order_id = event.get('orderId')
         tenant_id = event.get('tenantId', 'pardos')
@@ -139,7 +155,7 @@ def delivered_stage(event, context):
         
         completar_etapa_automatica(tenant_id, order_id, 'DELIVERY')
         registrar_etapa(tenant_id, order_id, 'DELIVERED', 'COMPLETED')
-        actualizar_estado_final(tenant_id, order_id, 'COMPLETED')
+        actualizar_estado_final(tenant_id, order_id, ESTADO_ENTREGADO)
         
         events.publish_event(
             source="pardos.etapas",
@@ -160,6 +176,7 @@ def delivered_stage(event, context):
             'status': 'COMPLETED',
             'message': 'Order delivered successfully',
             'orderId': order_id,
+            'tenantId': tenant_id,
             'stage': 'DELIVERED',
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -197,8 +214,8 @@ def completar_etapa_automatica(tenant_id, order_id, stage):
     try:
         response = dynamodb.query(
             table_name='steps',
-            key_condition='PK = :pk AND begins_with(SK, :sk)',
-            expression_values={
+            key_condition_expression='PK = :pk AND begins_with(SK, :sk)',
+            expression_attribute_values={
                 ':pk': f"TENANT#{tenant_id}#ORDER#{order_id}",
                 ':sk': f"STEP#{stage}"
             }
@@ -226,10 +243,54 @@ def completar_etapa_automatica(tenant_id, order_id, stage):
     except Exception as e:
         print(f"Error completando etapa automatica: {str(e)}")
 
+def actualizar_estado_pedido(tenant_id, order_id, status, current_step=None):
+    """
+    Actualiza el estado del pedido y su entrada en el índice sparse de activos:
+    los estados terminales eliminan activeKey/activeStatus del item. Solo
+    actualiza pedidos existentes (un orderId desconocido lanza
+    ConditionalCheckFailedException en lugar de crear un pedido a medias)
+    """
+    key = {
+        'PK': f"TENANT#{tenant_id}#ORDER#{order_id}",
+        'SK': 'METADATA'
+    }
+    values = {
+        ':status': status,
+        ':now': datetime.utcnow().isoformat()
+    }
+    update_expression = "SET #s = :status, updatedAt = :now"
+    
+    if current_step is not None:
+        values[':step'] = current_step
+        update_expression += ", currentStep = :step"
+    
+    if status in ESTADOS_ACTIVOS:
+        activo = active_order_attributes(tenant_id, order_id, status)
+        values[':ak'] = activo['activeKey']
+        values[':as'] = activo['activeStatus']
+        update_expression += ", activeKey = :ak, activeStatus = :as"
+    else:
+        update_expression += " REMOVE activeKey, activeStatus"
+    
+    dynamodb.update_item(
+        table_name='orders',
+        key=key,
+        update_expression=update_expression,
+        expression_names={'#s': 'status'},
+        expression_values=values,
+        condition_expression='attribute_exists(PK)'
+    )
+
+def pedido_no_encontrado(e):
+    return isinstance(e, ClientError) and e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
 def actualizar_estado_final(tenant_id, order_id, status):
     print(f"Actualizando estado final del pedido {order_id} a {status}")
+    actualizar_estado_pedido(tenant_id, order_id, status)
 
 def iniciar_etapa(event, context):
+    begin_invocation(context)
+    
     try:
         body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
         
@@ -238,6 +299,17 @@ def iniciar_etapa(event, context):
         stage = body['stage']
         assigned_to = body.get('assignedTo', 'Sistema')
         
+        # CREATED lo asigna el orquestador y DELIVERED se alcanza completando DELIVERY
+        if stage not in ESTADOS_ACTIVOS[1:]:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'Etapa inválida: {stage}', 'etapasValidas': ESTADOS_ACTIVOS[1:]})
+            }
+        
+        # La etapa iniciada es el estado del pedido (y su clave en el índice de activos);
+        # va primero para no registrar etapas de pedidos que no existen
+        actualizar_estado_pedido(tenant_id, order_id, stage, current_step=stage)
+        
         timestamp = datetime.utcnow().isoformat()
         step_record = {
             'PK': f"TENANT#{tenant_id}#ORDER#{order_id}",
@@ -252,19 +324,6 @@ def iniciar_etapa(event, context):
         
         dynamodb.put_item('steps', step_record)
         
-        dynamodb.update_item(
-            table_name='orders',
-            key={
-                'PK': f"TENANT#{tenant_id}#ORDER#{order_id}",
-                'SK': 'METADATA'
-            },
-            update_expression="SET currentStep = :step, updatedAt = :now",
-            expression_values={
-                ':step': stage,
-                ':now': timestamp
-            }
-        )
-        
         events.publish_event(
             source="pardos.etapas",
             detail_type="StageStarted",
@@ -286,12 +345,19 @@ def iniciar_etapa(event, context):
         }
         
     except Exception as e:
+        if pedido_no_encontrado(e):
+            return {
+                'statusCode': 404,
+                'body': json.dumps({'error': 'Pedido no encontrado'})
+            }
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
 
 def completar_etapa(event, context):
+    begin_invocation(context)
+    
     try:
         body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
         
@@ -332,6 +398,10 @@ def completar_etapa(event, context):
             }
         )
         
+        # Al completar la última etapa el pedido pasa a terminal y sale del índice de activos
+        if stage == ETAPA_FINAL:
+            actualizar_estado_pedido(tenant_id, order_id, ESTADO_ENTREGADO)
+        
         events.publish_event(
             source="pardos.etapas",
             detail_type="StageCompleted",
@@ -354,6 +424,11 @@ def completar_etapa(event, context):
         }
         
     except Exception as e:
+        if pedido_no_encontrado(e):
+            return {
+                'statusCode': 404,
+                'body': json.dumps({'error': 'Pedido no encontrado'})
+            }
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
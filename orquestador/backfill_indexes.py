@@ -0,0 +1,120 @@
+"""
+Backfill de los atributos de índice en los pedidos existentes.
+
+Los pedidos creados antes de ActiveOrdersIndex / OrdersByDateIndex no tienen
+createdDay, activeKey ni activeStatus, así que no aparecen en esos índices.
+Este script recorre los items METADATA de la tabla de pedidos y los completa:
+createdDay a partir de createdAt, y activeKey/activeStatus solo si el pedido
+no está en un estado terminal (los terminales quedan fuera del índice sparse).
+También suma al contador de pedidos del tenant los pedidos que aún no estaban
+contados (marca countedInTotal), así que se puede correr más de una vez.
+
+Un pedido sin status es anterior al seguimiento de estados y se trata como
+terminal: no entra al índice de activos (currentStep no dice si ya se entregó).
+Si en realidad sigue en curso, vuelve al índice en su próxima transición de
+etapa. Cada update lleva como condición el status leído en el scan; si el
+pedido cambió mientras tanto se omite y la etapa ya dejó sus índices al día.
+
+Uso:
+    ORDERS_TABLE=pardos-restaurante-orders python -m orquestador.backfill_indexes --dry-run
+"""
+import argparse
+from botocore.exceptions import ClientError
+from shared.database import DynamoDB, ESTADOS_ACTIVOS, active_order_attributes, date_bucket
+
+
+def tenant_y_pedido(pk):
+    # PK = TENANT#<tenant>#ORDER#<orderId>
+    _, tenant_id, _, order_id = pk.split('#', 3)
+    return tenant_id, order_id
+
+
+def backfill_pedido(dynamodb, pedido, dry_run=False):
+    """Devuelve True si el pedido necesitaba cambios"""
+    tenant_id, order_id = tenant_y_pedido(pedido['PK'])
+    status = pedido.get('status')
+
+    sets = []
+    values = {}
+    remove = ''
+
+    if pedido.get('createdAt') and not pedido.get('createdDay'):
+        sets.append("createdDay = :day")
+        values[':day'] = date_bucket(tenant_id, pedido['createdAt'])
+
+    contar = not pedido.get('countedInTotal')
+    if contar:
+        sets.append("countedInTotal = :counted")
+        values[':counted'] = True
+
+    if status in ESTADOS_ACTIVOS:
+        activo = active_order_attributes(tenant_id, order_id, status)
+        if (pedido.get('activeKey'), pedido.get('activeStatus')) != (activo['activeKey'], activo['activeStatus']):
+            sets.append("activeKey = :ak, activeStatus = :as")
+            values[':ak'] = activo['activeKey']
+            values[':as'] = activo['activeStatus']
+    elif 'activeKey' in pedido or 'activeStatus' in pedido:
+        remove = " REMOVE activeKey, activeStatus"
+
+    if not sets and not remove:
+        return False
+
+    update_expression = (f"SET {', '.join(sets)}" if sets else '') + remove
+    print(f"{pedido['PK']}: {update_expression.strip()}")
+
+    # Solo si el status sigue siendo el del scan
+    if status is None:
+        condition = 'attribute_not_exists(#s)'
+    else:
+        condition = '#s = :old'
+        values[':old'] = status
+    if contar:
+        # Otra corrida ya lo contó: no sumar dos veces
+        condition += ' AND attribute_not_exists(countedInTotal)'
+
+    if not dry_run:
+        try:
+            dynamodb.update_item(
+                table_name='orders',
+                key={'PK': pedido['PK'], 'SK': pedido['SK']},
+                update_expression=update_expression.strip(),
+                expression_names={'#s': 'status'},
+                expression_values=values,
+                condition_expression=condition
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            print(f"{pedido['PK']}: cambió durante el backfill, se omite")
+            return False
+        if contar:
+            dynamodb.increment_order_count(tenant_id)
+    return True
+
+
+def backfill(dynamodb=None, dry_run=False):
+    dynamodb = dynamodb or DynamoDB()
+    revisados = 0
+    actualizados = 0
+    pedidos = dynamodb.scan(
+        table_name='orders',
+        filter_expression='SK = :sk',
+        expression_attribute_values={':sk': 'METADATA'}
+    )
+    for pedido in pedidos:
+        revisados += 1
+        if backfill_pedido(dynamodb, pedido, dry_run=dry_run):
+            actualizados += 1
+    print(f"Pedidos revisados: {revisados}, actualizados: {actualizados}")
+    return revisados, actualizados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Completa los atributos de índice de los pedidos existentes')
+    parser.add_argument('--dry-run', action='store_true', help='solo muestra los cambios')
+    args = parser.parse_args(argv)
+    backfill(dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
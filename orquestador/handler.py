@@ -1,15 +1,19 @@
 import json
 import boto3
 import uuid
+from botocore.exceptions import ClientError
 from datetime import datetime
-from shared.database import DynamoDB
+from shared.database import DynamoDB, active_order_attributes, date_bucket, utc_isoformat
 from shared.events import EventBridge
+from shared.retry import begin_invocation
 
 stepfunctions = boto3.client('stepfunctions')
 dynamodb = DynamoDB()
 events = EventBridge()
 
 def iniciar_orquestacion(event, context):
+    begin_invocation(context)
+    
     try:
         detail = event['detail']
         order_id = detail.get('orderId')
@@ -25,6 +29,8 @@ def iniciar_orquestacion(event, context):
         # Por ahora solo hacemos log del evento recibido
         print(f"Evento OrderReceived recibido: {json.dumps(detail)}")
         
+        registrar_pedido(tenant_id, order_id, customer_id, fecha_creacion(detail))
+        
         # Publicar evento de workflow iniciado (sin Event Bus específico)
         events.publish_event(
             source="pardos.orquestador",
@@ -53,3 +59,53 @@ def iniciar_orquestacion(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
+
+def fecha_creacion(detail):
+    """
+    createdAt del evento en UTC (los clientes pueden mandarlo con offset, p. ej.
+    -05:00); si falta o no es ISO se usa la hora de recepción
+    """
+    created_at = detail.get('createdAt')
+    if created_at:
+        try:
+            return utc_isoformat(created_at)
+        except ValueError:
+            print(f"createdAt inválido ({created_at!r}), se usa la hora de recepción")
+    return datetime.utcnow().isoformat()
+
+def registrar_pedido(tenant_id, order_id, customer_id, created_at):
+    """
+    Registra el pedido como CREATED con los atributos de los índices de
+    pedidos activos (sparse) y por fecha, y suma uno al contador del tenant.
+    EventBridge entrega al menos una vez: si el pedido ya existe, un
+    OrderCreated duplicado no lo toca ni lo vuelve a contar
+    """
+    activo = active_order_attributes(tenant_id, order_id, 'CREATED')
+    try:
+        dynamodb.update_item(
+            table_name='orders',
+            key={
+                'PK': f"TENANT#{tenant_id}#ORDER#{order_id}",
+                'SK': 'METADATA'
+            },
+            update_expression="SET #s = :status, customerId = :customer, createdAt = :created, "
+                              "createdDay = :day, activeKey = :ak, activeStatus = :as, countedInTotal = :counted",
+            condition_expression='attribute_not_exists(PK)',
+            expression_names={'#s': 'status'},
+            expression_values={
+                ':status': 'CREATED',
+                ':customer': customer_id,
+                ':created': created_at,
+                ':day': date_bucket(tenant_id, created_at),
+                ':ak': activo['activeKey'],
+                ':as': activo['activeStatus'],
+                ':counted': True
+            }
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        print(f"Pedido {order_id} ya registrado, OrderCreated duplicado ignorado")
+        return
+    
+    dynamodb.increment_order_count(tenant_id)
@@ -0,0 +1,447 @@
+"""
+Ejecutor local de orquestador/statemachine.json para pruebas de carga.
+
+Interpreta el subconjunto del Amazon States Language que usa el flujo
+(Task, Pass, Parameters, ResultPath, Next, End, TimeoutSeconds), enlaza cada
+Task con su handler de etapas/handler.py y corre miles de pedidos en paralelo
+sobre un reloj simulado. Cada pedido entra como en producción, por
+orquestador.iniciar_orquestacion (evento OrderCreated), antes del StartAt.
+Mientras corre, DynamoDB y EventBridge se reemplazan por clientes en memoria
+que cuentan las llamadas, así que no hace falta una cuenta de AWS.
+
+Uso:
+    python -m orquestador.local_executor --orders 5000 --arrival-rate 10
+"""
+import argparse
+import contextlib
+import heapq
+import json
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter, defaultdict
+from botocore.exceptions import ClientError
+
+# Los handlers leen las tablas del entorno y crean clientes boto3 al importarse
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('ORDERS_TABLE', 'local-orders')
+os.environ.setdefault('STEPS_TABLE', 'local-steps')
+
+from etapas import handler as etapas
+from orquestador import handler as orquestador
+from shared.retry import RetryPolicy, TokenBucket
+
+STATE_MACHINE_PATH = os.path.join(os.path.dirname(__file__), 'statemachine.json')
+
+# currentStage de cada Task -> handler de etapas
+STAGE_HANDLERS = {
+    'COOKING': etapas.cooking_stage,
+    'PACKAGING': etapas.packaging_stage,
+    'DELIVERY': etapas.delivery_stage,
+}
+
+# Acción de la cola que representa la llegada del evento OrderCreated
+ORDER_CREATED = 'OrderCreated'
+
+# Duración media simulada de cada etapa, en segundos
+DEFAULT_STAGE_SECONDS = {
+    'COOKING': 900,
+    'PACKAGING': 180,
+    'DELIVERY': 1500,
+}
+
+
+class StatesError(Exception):
+    """Error de ejecución con el nombre que usaría Step Functions (States.Timeout, ...)"""
+
+    def __init__(self, error, cause=''):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+class FakeDynamoDBClient:
+    """
+    Cliente DynamoDB en memoria (formato de bajo nivel, como boto3.client).
+    Soporta las expresiones que usan los handlers: PK = :pk con SK = :sk o
+    begins_with(SK, :sk), UpdateExpression con SET/REMOVE o un ADD numérico y
+    las condiciones attribute_not_exists(PK) / attribute_exists(PK)
+    """
+
+    def __init__(self, calls):
+        self.calls = calls
+        # tabla -> PK -> SK -> item
+        self.tables = defaultdict(lambda: defaultdict(dict))
+
+    def put_item(self, TableName, Item):
+        self.calls['dynamodb.put_item'] += 1
+        self.tables[TableName][Item['PK']['S']][Item['SK']['S']] = dict(Item)
+        return {}
+
+    def get_item(self, TableName, Key, **kwargs):
+        self.calls['dynamodb.get_item'] += 1
+        item = self.tables[TableName][Key['PK']['S']].get(Key['SK']['S'])
+        return {'Item': dict(item)} if item else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues=None,
+                    ExpressionAttributeNames=None, ConditionExpression=None, **kwargs):
+        self.calls['dynamodb.update_item'] += 1
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        partition = self.tables[TableName][Key['PK']['S']]
+
+        if ConditionExpression is not None:
+            if ConditionExpression not in ('attribute_not_exists(PK)', 'attribute_exists(PK)'):
+                raise NotImplementedError(f"Condición no soportada localmente: {ConditionExpression}")
+            if (Key['SK']['S'] in partition) == (ConditionExpression == 'attribute_not_exists(PK)'):
+                raise ClientError(
+                    {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+                    'UpdateItem'
+                )
+
+        item = partition.setdefault(Key['SK']['S'], dict(Key))
+
+        set_clause, _, remove_clause = UpdateExpression.partition(' REMOVE ')
+        set_clause = set_clause.strip()
+        if set_clause.startswith('ADD '):
+            attr, value = set_clause[4:].split()
+            total = int(item.get(attr, {'N': '0'})['N']) + int(values[value]['N'])
+            item[attr] = {'N': str(total)}
+        elif set_clause.startswith('SET '):
+            for assignment in re.split(r',\s*(?![^()]*\))', set_clause[4:]):
+                attr, _, expr = assignment.partition('=')
+                attr = names.get(attr.strip(), attr.strip())
+                expr = expr.strip()
+                default = re.match(r'if_not_exists\((\S+),\s*(:\w+)\)', expr)
+                if default:
+                    item.setdefault(attr, values[default.group(2)])
+                else:
+                    item[attr] = values[expr]
+        for attr in filter(None, remove_clause.split(',')):
+            item.pop(names.get(attr.strip(), attr.strip()), None)
+        return {}
+
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeValues, **kwargs):
+        self.calls['dynamodb.query'] += 1
+        condition = re.fullmatch(
+            r'PK = (:\w+)(?: AND (?:SK = (:\w+)|begins_with\(SK, (:\w+)\)))?',
+            KeyConditionExpression.strip()
+        )
+        if not condition or 'IndexName' in kwargs:
+            raise NotImplementedError(f"Query no soportada localmente: {KeyConditionExpression}")
+
+        pk = ExpressionAttributeValues[condition.group(1)]['S']
+        sk_equal = condition.group(2) and ExpressionAttributeValues[condition.group(2)]['S']
+        sk_prefix = condition.group(3) and ExpressionAttributeValues[condition.group(3)]['S']
+
+        items = []
+        for item_sk, item in self.tables[TableName][pk].items():
+            if sk_equal and item_sk != sk_equal:
+                continue
+            if sk_prefix and not item_sk.startswith(sk_prefix):
+                continue
+            items.append(dict(item))
+        items.sort(key=lambda i: i['SK']['S'], reverse=kwargs.get('ScanIndexForward') is False)
+        return {'Items': items, 'Count': len(items)}
+
+
+class FakeEventBridgeClient:
+    def __init__(self, calls):
+        self.calls = calls
+        self.published = Counter()
+
+    def put_events(self, Entries):
+        self.calls['events.put_events'] += 1
+        for entry in Entries:
+            self.published[entry['DetailType']] += 1
+        return {'FailedEntryCount': 0, 'Entries': [{'EventId': str(uuid.uuid4())} for _ in Entries]}
+
+
+class LocalContext:
+    """Contexto mínimo de Lambda; el timeout es el de serverless.yml"""
+
+    def __init__(self, function_name, timeout=29):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self.deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def read_path(data, path):
+    """JSONPath de referencia simple: $ o $.a.b"""
+    if path == '$':
+        return data
+    if not path.startswith('$.'):
+        raise NotImplementedError(f"JSONPath no soportado: {path}")
+    for part in path[2:].split('.'):
+        if not isinstance(data, dict) or part not in data:
+            raise StatesError('States.Runtime', f"La ruta {path} no existe en la entrada")
+        data = data[part]
+    return data
+
+
+def resolve_parameters(parameters, data):
+    resolved = {}
+    for key, value in parameters.items():
+        if key.endswith('.$'):
+            resolved[key[:-2]] = read_path(data, value)
+        elif isinstance(value, dict):
+            resolved[key] = resolve_parameters(value, data)
+        else:
+            resolved[key] = value
+    return resolved
+
+
+def apply_result_path(data, result, result_path):
+    if result_path is None:
+        return data
+    if result_path == '$':
+        return result
+    if not result_path.startswith('$.'):
+        raise NotImplementedError(f"ResultPath no soportado: {result_path}")
+    output = dict(data)
+    node = output
+    parts = result_path[2:].split('.')
+    for part in parts[:-1]:
+        node[part] = dict(node.get(part) or {})
+        node = node[part]
+    node[parts[-1]] = result
+    return output
+
+
+class Execution:
+    def __init__(self, execution_id, data, state, started_at):
+        self.execution_id = execution_id
+        self.data = data
+        self.state = state
+        self.started_at = started_at
+        self.aws_calls = 0
+
+
+class LocalStateMachine:
+    """
+    Intérprete del state machine sobre un reloj simulado. Cada Task corre su
+    handler de inmediato (tiempo real medido) y la etapa termina cuando vence
+    su duración simulada; si supera TimeoutSeconds falla con States.Timeout.
+    Un handler que devuelve status FAILED termina la ejecución como fallida
+    """
+
+    def __init__(self, definition, stage_seconds=None, spread=0.5, seed=None, quiet=True):
+        self.definition = definition
+        self.stage_seconds = dict(DEFAULT_STAGE_SECONDS, **(stage_seconds or {}))
+        self.spread = spread
+        self.random = random.Random(seed)
+        self.quiet = quiet
+        self.devnull = None
+
+        self.calls = Counter()
+        self.dynamodb = FakeDynamoDBClient(self.calls)
+        self.events = FakeEventBridgeClient(self.calls)
+
+        self.clock = 0.0
+        self.queue = []
+        self.sequence = 0
+        self.stage_latency = defaultdict(list)
+        self.handler_ms = defaultdict(list)
+        self.completed = []
+        self.failed = Counter()
+
+    @classmethod
+    def from_file(cls, path=STATE_MACHINE_PATH, **kwargs):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    @contextlib.contextmanager
+    def fakes(self):
+        """
+        Instala los clientes en memoria en los wrappers de los handlers y
+        restaura los originales al salir, aunque la corrida falle
+        """
+        instalar = []
+        for module in (orquestador, etapas):
+            instalar += [(module.dynamodb, self.dynamodb), (module.events, self.events)]
+        originales = [(wrapper, wrapper.client, wrapper.retry) for wrapper, _ in instalar]
+        try:
+            for wrapper, client in instalar:
+                wrapper.client = client
+                # En Lambda cada contenedor atiende un pedido a la vez; aquí un solo
+                # proceso simula miles, así que el rate limiter no debe frenar la corrida
+                wrapper.retry = RetryPolicy(bucket=TokenBucket(rate=1e9, max_rate=1e9))
+            yield self
+        finally:
+            for wrapper, client, retry in originales:
+                wrapper.client = client
+                wrapper.retry = retry
+
+    def schedule(self, at, execution, action):
+        self.sequence += 1
+        heapq.heappush(self.queue, (at, self.sequence, execution, action))
+
+    def start(self, data, at=0.0):
+        execution = Execution(str(uuid.uuid4()), data, self.definition['StartAt'], at)
+        self.schedule(at, execution, ORDER_CREATED)
+        return execution
+
+    def receive(self, execution):
+        """Entrega el OrderCreated al orquestador y arranca el state machine"""
+        detail = {
+            'orderId': execution.data['orderId'],
+            'customerId': execution.data.get('customerId')
+        }
+        result = self.invoke(execution, ORDER_CREATED, orquestador.iniciar_orquestacion, {'detail': detail})
+        if result.get('statusCode') != 200:
+            raise StatesError('OrderCreated.Failed', result.get('body', ''))
+        self.schedule(self.clock, execution, None)
+
+    def sample_duration(self, stage):
+        mean = self.stage_seconds.get(stage, 0)
+        return self.random.uniform(mean * (1 - self.spread), mean * (1 + self.spread))
+
+    def invoke(self, execution, state_name, handler, payload):
+        before = sum(self.calls.values())
+        inicio = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            if self.quiet:
+                stack.enter_context(contextlib.redirect_stdout(self.devnull))
+            result = handler(payload, LocalContext(handler.__name__))
+        self.handler_ms[state_name].append((time.perf_counter() - inicio) * 1000)
+        execution.aws_calls += sum(self.calls.values()) - before
+        return result
+
+    def step(self, execution, finished):
+        """Procesa la llegada a un estado, o el fin de una Task en curso"""
+        state = self.definition['States'][execution.state]
+
+        if finished is None and state['Type'] == 'Task':
+            payload = resolve_parameters(state.get('Parameters', {}), execution.data) if 'Parameters' in state else execution.data
+            handler = STAGE_HANDLERS[payload.get('currentStage')]
+            result = self.invoke(execution, execution.state, handler, payload)
+            if isinstance(result, dict) and result.get('status') == 'FAILED':
+                raise StatesError('States.TaskFailed', result.get('error', ''))
+
+            duration = self.handler_ms[execution.state][-1] / 1000 + self.sample_duration(payload.get('currentStage'))
+            timeout = state.get('TimeoutSeconds')
+            if timeout is not None and duration > timeout:
+                raise StatesError('States.Timeout', f"{execution.state} superó {timeout}s")
+
+            self.stage_latency[execution.state].append(duration)
+            self.schedule(self.clock + duration, execution, (result, state))
+            return
+
+        if state['Type'] == 'Task':
+            result, state = finished
+            execution.data = apply_result_path(execution.data, result, state.get('ResultPath', '$'))
+        elif state['Type'] == 'Pass':
+            result = state.get('Result', resolve_parameters(state['Parameters'], execution.data) if 'Parameters' in state else execution.data)
+            execution.data = apply_result_path(execution.data, result, state.get('ResultPath', '$'))
+        else:
+            raise NotImplementedError(f"Tipo de estado no soportado: {state['Type']}")
+
+        if state.get('End'):
+            self.completed.append((execution, self.clock - execution.started_at))
+            return
+
+        execution.state = state['Next']
+        self.schedule(self.clock, execution, None)
+
+    def run(self):
+        with self.fakes(), open(os.devnull, 'w') as devnull:
+            self.devnull = devnull
+            while self.queue:
+                self.clock, _, execution, action = heapq.heappop(self.queue)
+                try:
+                    if action == ORDER_CREATED:
+                        self.receive(execution)
+                    else:
+                        self.step(execution, action)
+                except StatesError as e:
+                    self.failed[e.error] += 1
+        self.devnull = None
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run_load_test(orders=1000, arrival_rate=5.0, tenant_id='pardos', stage_seconds=None, spread=0.5, seed=None, quiet=True):
+    """
+    Lanza `orders` ejecuciones con llegadas Poisson a `arrival_rate` pedidos por
+    segundo simulado y devuelve el reporte de throughput, latencias y llamadas
+    """
+    machine = LocalStateMachine.from_file(stage_seconds=stage_seconds, spread=spread, seed=seed, quiet=quiet)
+
+    llegada = 0.0
+    for i in range(orders):
+        machine.start({'orderId': f"local-{i}", 'tenantId': tenant_id, 'customerId': f"c{i}"}, at=llegada)
+        llegada += machine.random.expovariate(arrival_rate)
+
+    inicio = time.perf_counter()
+    machine.run()
+    wall = time.perf_counter() - inicio
+
+    completados = len(machine.completed)
+    llamadas = sum(e.aws_calls for e, _ in machine.completed)
+    return {
+        'orders': orders,
+        'completed': completados,
+        'failed': dict(machine.failed),
+        'simulatedSeconds': round(machine.clock, 3),
+        # Sin modelo de capacidad (concurrencia Lambda, límites de DynamoDB): solo
+        # refleja la tasa de llegada y el tiempo de vaciado de la cola
+        'simulatedCompletionsPerSecondUncapped': round(completados / machine.clock, 3) if machine.clock else 0.0,
+        'wallSeconds': round(wall, 3),
+        'wallOrdersPerSecond': round(completados / wall, 1) if wall else 0.0,
+        'endToEndSeconds': {
+            'p50': round(percentile([d for _, d in machine.completed], 50), 1),
+            'p95': round(percentile([d for _, d in machine.completed], 95), 1),
+        },
+        'stages': {
+            nombre: {
+                'p50Seconds': round(percentile(machine.stage_latency[nombre], 50), 1),
+                'p95Seconds': round(percentile(machine.stage_latency[nombre], 95), 1),
+                'maxSeconds': round(max(machine.stage_latency[nombre], default=0.0), 1),
+                'handlerP50Ms': round(percentile(machine.handler_ms[nombre], 50), 3),
+                'handlerP95Ms': round(percentile(machine.handler_ms[nombre], 95), 3),
+            }
+            for nombre in machine.handler_ms if nombre != ORDER_CREATED
+        },
+        # El orquestador no es una etapa del state machine: solo tiempo de handler
+        'orderCreated': {
+            'handlerP50Ms': round(percentile(machine.handler_ms[ORDER_CREATED], 50), 3),
+            'handlerP95Ms': round(percentile(machine.handler_ms[ORDER_CREATED], 95), 3),
+        },
+        'awsCallsPerOrder': round(llamadas / completados, 2) if completados else 0.0,
+        'awsCalls': dict(machine.calls),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga local del flujo de pedidos')
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--arrival-rate', type=float, default=5.0, help='pedidos por segundo simulado')
+    parser.add_argument('--tenant-id', default='pardos')
+    parser.add_argument('--spread', type=float, default=0.5, help='variación relativa de la duración de cada etapa')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--verbose', action='store_true', help='muestra los logs de los handlers')
+    args = parser.parse_args(argv)
+
+    reporte = run_load_test(
+        orders=args.orders,
+        arrival_rate=args.arrival_rate,
+        tenant_id=args.tenant_id,
+        spread=args.spread,
+        seed=args.seed,
+        quiet=not args.verbose
+    )
+    print(json.dumps(reporte, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,46 +1,121 @@
 import boto3
 import os
+from datetime import date, datetime, timedelta, timezone
 from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from shared.retry import RetryPolicy, boto_config
+
+# Índices secundarios de la tabla de pedidos (ver serverless.yml)
+ACTIVE_ORDERS_INDEX = 'ActiveOrdersIndex'
+ORDERS_BY_DATE_INDEX = 'OrdersByDateIndex'
+
+ESTADOS_ACTIVOS = ['CREATED', 'COOKING', 'PACKAGING', 'DELIVERY']
+
+# Estado terminal de un pedido entregado; la última etapa es DELIVERY
+ESTADO_ENTREGADO = 'DELIVERED'
+ETAPA_FINAL = 'DELIVERY'
+
+def active_order_attributes(tenant_id, order_id, status):
+    """
+    Atributos del índice sparse de pedidos activos; solo existen mientras el
+    pedido no está en un estado terminal
+    """
+    return {
+        'activeKey': f"TENANT#{tenant_id}#ACTIVE",
+        'activeStatus': f"{status}#{order_id}"
+    }
+
+def order_count_key(tenant_id):
+    """Item contador de pedidos del tenant (en la tabla de pedidos)"""
+    return {'PK': f"TENANT#{tenant_id}#STATS", 'SK': 'ORDER_COUNT'}
+
+def utc_isoformat(value):
+    """
+    Normaliza un timestamp ISO 8601 a UTC sin zona, el mismo formato que
+    datetime.utcnow().isoformat(), para que createdAt ordene bien en el índice
+    y createdDay caiga en el día UTC. Un valor sin zona se asume en UTC;
+    lanza ValueError si no es ISO
+    """
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+def date_bucket(tenant_id, created_at):
+    """Partición por día del índice de fechas (createdAt ISO en UTC)"""
+    return f"TENANT#{tenant_id}#DAY#{created_at[:10]}"
+
+def projection_expression(fields):
+    """
+    Convierte fields en ProjectionExpression con placeholders, para no chocar
+    con palabras reservadas (status, name, ...). DynamoDB no proyecta un atributo
+    dentro de cada elemento de una lista (items.name), así que se lee el atributo
+    de primer nivel y el recorte fino se hace con shared.responses.project
+    """
+    names = {}
+    for field in fields:
+        top = field.split('.')[0]
+        if top not in names.values():
+            names[f"#p{len(names)}"] = top
+    return ', '.join(names), names
 
 class DynamoDB:
-    def __init__(self):
-        self.client = boto3.client('dynamodb')
+    def __init__(self, retry_policy=None):
+        self.client = boto3.client('dynamodb', config=boto_config())
+        self.retry = retry_policy or RetryPolicy()
         self.serializer = TypeSerializer()
         self.deserializer = TypeDeserializer()
     
     def put_item(self, table_name, item):
         serialized_item = {k: self.serializer.serialize(v) for k, v in item.items()}
-        return self.client.put_item(
+        return self.retry.call(
+            'dynamodb.put_item',
+            self.client.put_item,
             TableName=os.environ[f"{table_name.upper()}_TABLE"],
             Item=serialized_item
         )
     
-    def get_item(self, table_name, key):
+    def get_item(self, table_name, key, fields=None):
         serialized_key = {k: self.serializer.serialize(v) for k, v in key.items()}
-        response = self.client.get_item(
-            TableName=os.environ[f"{table_name.upper()}_TABLE"],
-            Key=serialized_key
-        )
+        
+        params = {
+            'TableName': os.environ[f"{table_name.upper()}_TABLE"],
+            'Key': serialized_key
+        }
+        
+        if fields:
+            params['ProjectionExpression'], params['ExpressionAttributeNames'] = projection_expression(fields)
+        
+        response = self.retry.call('dynamodb.get_item', self.client.get_item, **params)
         return {k: self.deserializer.deserialize(v) for k, v in response.get('Item', {}).items()}
     
-    def update_item(self, table_name, key, update_expression, expression_values, expression_names=None):
+    def update_item(self, table_name, key, update_expression, expression_values, expression_names=None, condition_expression=None):
         serialized_key = {k: self.serializer.serialize(v) for k, v in key.items()}
         serialized_values = {k: self.serializer.serialize(v) for k, v in expression_values.items()}
         
         params = {
             'TableName': os.environ[f"{table_name.upper()}_TABLE"],
             'Key': serialized_key,
-            'UpdateExpression': update_expression,
-            'ExpressionAttributeValues': serialized_values
+            'UpdateExpression': update_expression
         }
         
+        # DynamoDB rechaza ExpressionAttributeValues vacío (p. ej. un REMOVE solo)
+        if serialized_values:
+            params['ExpressionAttributeValues'] = serialized_values
+            
+        
         if expression_names:
             params['ExpressionAttributeNames'] = expression_names
             
-        return self.client.update_item(**params)
+        if condition_expression:
+            params['ConditionExpression'] = condition_expression
+            
+        return self.retry.call('dynamodb.update_item', self.client.update_item, **params)
     
-    def query(self, table_name, key_condition_expression, expression_attribute_values, limit=None, scan_index_forward=None):
-        """Query corregido con parámetros válidos"""
+    def query(self, table_name, key_condition_expression, expression_attribute_values, limit=None, scan_index_forward=None, select=None, fields=None, index_name=None):
+        """
+        Query corregido con parámetros válidos. Sin limit se recorren todas las
+        páginas (LastEvaluatedKey) para no truncar resultados en silencio
+        """
         
         # Serializar valores de expresión
         serialized_values = {k: self.serializer.serialize(v) for k, v in expression_attribute_values.items()}
@@ -56,13 +131,113 @@ class DynamoDB:
             
         if scan_index_forward is not None:
             params['ScanIndexForward'] = scan_index_forward
+            
+        if select is not None:
+            params['Select'] = select
+            
+        if fields:
+            params['ProjectionExpression'], params['ExpressionAttributeNames'] = projection_expression(fields)
+            
+        if index_name is not None:
+            params['IndexName'] = index_name
+        
+        items = []
+        count = 0
+        while True:
+            response = self.retry.call('dynamodb.query', self.client.query, **params)
+            
+            # Deserializar items
+            items.extend({k: self.deserializer.deserialize(v) for k, v in item.items()} for item in response.get('Items', []))
+            count += response.get('Count', 0)
+            
+            if limit is not None or 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        
+        return {
+            'Items': items,
+            'Count': count
+        }
+    
+    def scan(self, table_name, filter_expression=None, expression_attribute_values=None, fields=None):
+        """Recorre toda la tabla página por página; solo para tareas de mantenimiento"""
+        params = {'TableName': os.environ[f"{table_name.upper()}_TABLE"]}
         
-        response = self.client.query(**params)
+        if filter_expression:
+            params['FilterExpression'] = filter_expression
+            params['ExpressionAttributeValues'] = {k: self.serializer.serialize(v) for k, v in expression_attribute_values.items()}
+            
+        if fields:
+            params['ProjectionExpression'], params['ExpressionAttributeNames'] = projection_expression(fields)
+        
+        while True:
+            response = self.retry.call('dynamodb.scan', self.client.scan, **params)
+            for item in response.get('Items', []):
+                yield {k: self.deserializer.deserialize(v) for k, v in item.items()}
+            
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    def increment_order_count(self, tenant_id, amount=1):
+        return self.update_item(
+            table_name='orders',
+            key=order_count_key(tenant_id),
+            update_expression="ADD totalPedidos :n",
+            expression_values={':n': amount}
+        )
+    
+    def get_order_count(self, tenant_id):
+        item = self.get_item('orders', order_count_key(tenant_id))
+        return int(item.get('totalPedidos', 0))
+    
+    def query_active_orders(self, tenant_id, status=None, select=None, fields=None, limit=None):
+        """Pedidos no terminales vía el índice sparse, opcionalmente de un solo estado"""
+        key_condition = 'activeKey = :ak'
+        values = {':ak': f"TENANT#{tenant_id}#ACTIVE"}
+        
+        if status is not None:
+            key_condition += ' AND begins_with(activeStatus, :st)'
+            values[':st'] = f"{status}#"
         
-        # Deserializar items
-        items = [ {k: self.deserializer.deserialize(v) for k, v in item.items()} for item in response.get('Items', []) ]
+        return self.query(
+            table_name='orders',
+            key_condition_expression=key_condition,
+            expression_attribute_values=values,
+            limit=limit,
+            select=select,
+            fields=fields,
+            index_name=ACTIVE_ORDERS_INDEX
+        )
+    
+    def query_orders_between(self, tenant_id, start, end, select=None, fields=None, limit=None):
+        """
+        Pedidos con createdAt entre start y end (ISO, inclusive): un query por
+        cada día del rango sobre el índice de fechas. Con limit se detiene al
+        juntar esa cantidad de pedidos
+        """
+        items = []
+        count = 0
+        day = date.fromisoformat(start[:10])
+        while day.isoformat() <= end[:10] and (limit is None or count < limit):
+            response = self.query(
+                table_name='orders',
+                key_condition_expression='createdDay = :day AND createdAt BETWEEN :start AND :end',
+                expression_attribute_values={
+                    ':day': date_bucket(tenant_id, day.isoformat()),
+                    ':start': start,
+                    ':end': end
+                },
+                limit=None if limit is None else limit - count,
+                select=select,
+                fields=fields,
+                index_name=ORDERS_BY_DATE_INDEX
+            )
+            items.extend(response['Items'])
+            count += response['Count']
+            day += timedelta(days=1)
         
         return {
             'Items': items,
-            'Count': response.get('Count', 0)
+            'Count': count
         }
@@ -1,18 +1,36 @@
 import boto3
 import json
 import os
+from botocore.exceptions import ClientError
+from shared.retry import RetryPolicy, boto_config
 
 class EventBridge:
-    def __init__(self):
-        self.client = boto3.client('events')
+    def __init__(self, retry_policy=None):
+        self.client = boto3.client('events', config=boto_config())
+        self.retry = retry_policy or RetryPolicy()
     
     def publish_event(self, source, detail_type, detail):
-        return self.client.put_events(
-            Entries=[
-                {
-                    'Source': source,
-                    'DetailType': detail_type,
-                    'Detail': json.dumps(detail)
-                }
-            ]
-        )
+        pending = [
+            {
+                'Source': source,
+                'DetailType': detail_type,
+                'Detail': json.dumps(detail)
+            }
+        ]
+        def put_pending():
+            # put_events responde 200 aunque alguna entrada falle: se reenvían solo
+            # las fallidas y su ErrorCode pasa por la misma clasificación que
+            # cualquier ClientError (throttle, transitorio o definitivo)
+            response = self.client.put_events(Entries=pending)
+            if not response.get('FailedEntryCount', 0):
+                return response
+            
+            failed = [(entry, result) for entry, result in zip(pending, response['Entries']) if result.get('ErrorCode')]
+            pending[:] = [entry for entry, _ in failed]
+            error = failed[0][1]
+            raise ClientError(
+                {'Error': {'Code': error['ErrorCode'], 'Message': error.get('ErrorMessage', '')}},
+                'PutEvents'
+            )
+        
+        return self.retry.call('events.put_events', put_pending)
@@ -0,0 +1,84 @@
+import json
+from decimal import Decimal
+
+# Con integración lambda-proxy, cors: true no agrega estos headers a la
+# respuesta de la función; hay que devolverlos desde el handler
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Expose-Headers': 'X-Aws-Calls, X-Aws-Retries, X-Aws-Throttles, Retry-After'
+}
+
+
+def _default(obj):
+    # DynamoDB devuelve los números como Decimal
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def dumps(data):
+    """Serializa a JSON compacto, sin espacios entre separadores"""
+    return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False)
+
+
+def parse_fields(event):
+    """
+    Lee el parámetro fields=a,b,items.name y lo devuelve como lista de rutas;
+    None si no se pidió proyección
+    """
+    params = event.get('queryStringParameters') or {}
+    raw = params.get('fields')
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    return fields or None
+
+
+def project(data, fields):
+    """
+    Aplica la misma proyección en memoria (listas anidadas incluidas). Una ruta
+    pedida completa gana sobre sus hijas: fields=items,items.name devuelve items
+    entero
+    """
+    if fields is None:
+        return data
+    # None marca un valor pedido completo; no se desciende dentro de él
+    tree = {}
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for i, part in enumerate(parts):
+            if part in node and node[part] is None:
+                break
+            if i == len(parts) - 1:
+                node[part] = None
+            else:
+                node = node.setdefault(part, {})
+    return _project(data, tree)
+
+
+def _project(data, tree):
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [_project(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {k: _project(data[k], sub) for k, sub in tree.items() if k in data}
+    return data
+
+
+def respuesta(status_code, data, headers=None):
+    """
+    Arma la respuesta HTTP con JSON compacto y headers CORS. La compresión la
+    hace API Gateway (minimumCompressionSize en serverless.yml) según el
+    Accept-Encoding del cliente
+    """
+    headers = dict(headers or {}, **CORS_HEADERS)
+    headers['Content-Type'] = 'application/json'
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': dumps(data)
+    }
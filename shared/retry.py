@@ -0,0 +1,262 @@
+import os
+import random
+import threading
+import time
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError, ConnectTimeoutError
+
+# Codigos de error que AWS devuelve cuando nos esta limitando
+THROTTLE_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'SlowDown',
+    'LimitExceededException',
+}
+
+# Errores transitorios que vale la pena reintentar
+TRANSIENT_CODES = {
+    'InternalServerError',
+    'InternalFailure',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+    'TransactionInProgressException',
+    'RequestTimeout',
+    'RequestTimeoutException',
+}
+
+# Lambda corta a los 29s (ver serverless.yml); dejamos margen para responder
+DEFAULT_DEADLINE = float(os.environ.get('AWS_OPERATION_DEADLINE', '25'))
+
+# Tiempo reservado al final de la invocacion para armar la respuesta
+RESPONSE_MARGIN = 1.0
+
+CONNECT_TIMEOUT = 2
+READ_TIMEOUT = 5
+
+# Lo maximo que puede tardar un intento antes de que botocore lo corte
+ATTEMPT_TIMEOUT = CONNECT_TIMEOUT + READ_TIMEOUT
+
+
+def boto_config():
+    """
+    Config para los clientes boto3: los reintentos los maneja RetryPolicy,
+    asi que botocore hace un solo intento con timeouts cortos
+    """
+    return Config(
+        retries={'total_max_attempts': 1, 'mode': 'standard'},
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT
+    )
+
+
+class ThrottledError(Exception):
+    """AWS siguio limitando las llamadas hasta agotar intentos o el deadline"""
+
+    def __init__(self, operation, cause=None):
+        super().__init__(f"{operation} limitado por AWS (throttling)")
+        self.operation = operation
+        self.cause = cause
+
+
+class DeadlineExceededError(Exception):
+    """La operacion no termino antes de su deadline"""
+
+    def __init__(self, operation, deadline):
+        super().__init__(f"{operation} excedio el deadline de {deadline:.1f}s")
+        self.operation = operation
+        self.deadline = deadline
+
+
+class TokenBucket:
+    """
+    Rate limiter del lado del cliente. La tasa de recarga baja a la mitad
+    con cada throttle y se recupera de a poco con cada respuesta exitosa
+    """
+
+    def __init__(self, rate=50.0, min_rate=0.5, max_rate=500.0, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.last = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def acquire(self, deadline):
+        """Espera un token; devuelve False si no llega antes del deadline"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                espera = (1 - self.tokens) / self.rate
+            if self.clock() + espera > deadline:
+                return False
+            self.sleep(espera)
+
+    def on_throttle(self):
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.capacity = max(self.rate, 1.0)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + 1)
+            self.capacity = max(self.rate, 1.0)
+
+
+class RetryStats:
+    """Contadores de llamadas, reintentos y throttles por operacion"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def incr(self, operation, name):
+        with self.lock:
+            op = self.counters.setdefault(operation, {
+                'calls': 0, 'retries': 0, 'throttles': 0, 'errors': 0, 'deadlines': 0
+            })
+            op[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {op: dict(valores) for op, valores in self.counters.items()}
+
+    def totals(self):
+        total = {'calls': 0, 'retries': 0, 'throttles': 0, 'errors': 0, 'deadlines': 0}
+        for valores in self.snapshot().values():
+            for k, v in valores.items():
+                total[k] += v
+        return total
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+
+
+# Contadores compartidos por todos los wrappers del proceso
+retry_stats = RetryStats()
+
+# Deadline (time.monotonic) de la invocacion Lambda en curso; None fuera de Lambda
+invocation_deadline = None
+
+
+def begin_invocation(context, clock=time.monotonic):
+    """
+    Se llama al inicio de cada handler: reinicia los contadores y fija un unico
+    presupuesto de tiempo para todas las llamadas AWS de la invocacion, a partir
+    de context.get_remaining_time_in_millis()
+    """
+    global invocation_deadline
+    retry_stats.reset()
+    remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    invocation_deadline = clock() + remaining() / 1000 - RESPONSE_MARGIN if remaining else None
+
+
+def error_code(error):
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code', '')
+    return ''
+
+
+def is_throttle(error):
+    return error_code(error) in THROTTLE_CODES
+
+
+def is_retryable(error):
+    if is_throttle(error):
+        return True
+    if isinstance(error, (ConnectionError, ReadTimeoutError, ConnectTimeoutError)):
+        return True
+    if isinstance(error, ClientError):
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return error_code(error) in TRANSIENT_CODES or status >= 500
+    return False
+
+
+class RetryPolicy:
+    """
+    Reintentos con backoff exponencial (full jitter), rate limiting adaptativo
+    y un deadline por operacion que respeta el timeout de Lambda
+    """
+
+    def __init__(self, max_attempts=5, base_delay=0.05, max_delay=2.0, deadline=DEFAULT_DEADLINE,
+                 attempt_timeout=ATTEMPT_TIMEOUT, bucket=None, stats=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.bucket = bucket or TokenBucket(clock=clock, sleep=sleep)
+        self.stats = stats or retry_stats
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, operation, fn, *args, deadline=None, **kwargs):
+        """
+        El deadline es el menor entre el de la operacion y el de la invocacion
+        (begin_invocation). Un intento solo arranca si su timeout completo cabe
+        antes del deadline, asi ninguna llamada se pasa del limite de Lambda
+        """
+        inicio = self.clock()
+        vence = inicio + (deadline if deadline is not None else self.deadline)
+        if invocation_deadline is not None:
+            vence = min(vence, invocation_deadline)
+        limite = max(vence - inicio, 0.0)
+        attempt = 0
+
+        while True:
+            if not self.bucket.acquire(vence - self.attempt_timeout) or self.clock() + self.attempt_timeout > vence:
+                self.stats.incr(operation, 'deadlines')
+                raise DeadlineExceededError(operation, limite)
+
+            self.stats.incr(operation, 'calls')
+            try:
+                result = fn(*args, **kwargs)
+                self.bucket.on_success()
+                return result
+            except Exception as e:
+                throttled = is_throttle(e)
+                if throttled:
+                    self.stats.incr(operation, 'throttles')
+                    self.bucket.on_throttle()
+
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    self.stats.incr(operation, 'errors')
+                    if throttled:
+                        raise ThrottledError(operation, e) from e
+                    raise
+
+                espera = self.backoff(attempt)
+                if self.clock() + espera + self.attempt_timeout > vence:
+                    self.stats.incr(operation, 'deadlines')
+                    if throttled:
+                        raise ThrottledError(operation, e) from e
+                    raise DeadlineExceededError(operation, limite) from e
+
+                self.stats.incr(operation, 'retries')
+                print(f"Reintentando {operation} (intento {attempt + 1}) en {espera:.3f}s: {error_code(e) or type(e).__name__}")
+                self.sleep(espera)
+
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+# Los handlers crean clientes boto3 y leen las tablas del entorno al importarse
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('ORDERS_TABLE', 'local-orders')
+os.environ.setdefault('STEPS_TABLE', 'local-steps')
+
+
+class StubDynamoDBClient:
+    """
+    Reemplaza al cliente boto3 de bajo nivel: guarda cada llamada y devuelve
+    las respuestas encoladas por operación ({} si no hay ninguna)
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.responses = {}
+
+    def __getattr__(self, operation):
+        def call(**kwargs):
+            self.calls.append((operation, kwargs))
+            respuestas = self.responses.get(operation) or []
+            respuesta = respuestas.pop(0) if respuestas else {}
+            if isinstance(respuesta, Exception):
+                raise respuesta
+            return respuesta
+        return call
+
+    def sent(self, operation):
+        return [kwargs for op, kwargs in self.calls if op == operation]
+
+
+@pytest.fixture
+def stub_client():
+    return StubDynamoDBClient()
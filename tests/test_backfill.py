@@ -0,0 +1,98 @@
+from botocore.exceptions import ClientError
+
+from orquestador.backfill_indexes import backfill
+
+
+class FakeDynamoDB:
+    def __init__(self, pedidos, cambiados=()):
+        self.pedidos = pedidos
+        # PKs que cambian entre el scan y el update
+        self.cambiados = set(cambiados)
+        self.updates = []
+        self.contados = {}
+
+    def scan(self, **kwargs):
+        return iter(self.pedidos)
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs)
+        if kwargs['key']['PK'] in self.cambiados:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+
+    def increment_order_count(self, tenant_id, amount=1):
+        self.contados[tenant_id] = self.contados.get(tenant_id, 0) + amount
+
+
+def pedido(order_id, **attrs):
+    return dict({'PK': f"TENANT#pardos#ORDER#{order_id}", 'SK': 'METADATA'}, **attrs)
+
+
+def test_backfill_adds_index_attributes_to_active_orders():
+    dynamodb = FakeDynamoDB([pedido('o1', status='COOKING', createdAt='2025-11-10T04:29:43')])
+
+    assert backfill(dynamodb) == (1, 1)
+
+    update = dynamodb.updates[0]
+    assert update['expression_values'] == {
+        ':day': 'TENANT#pardos#DAY#2025-11-10',
+        ':ak': 'TENANT#pardos#ACTIVE',
+        ':as': 'COOKING#o1',
+        ':counted': True,
+        ':old': 'COOKING'
+    }
+    assert update['condition_expression'] == '#s = :old AND attribute_not_exists(countedInTotal)'
+    assert dynamodb.contados == {'pardos': 1}
+
+
+def test_backfill_removes_terminal_orders_from_active_index():
+    dynamodb = FakeDynamoDB([pedido(
+        'o2', status='DELIVERED', createdDay='x', activeKey='k', activeStatus='s', countedInTotal=True
+    )])
+
+    backfill(dynamodb)
+
+    assert dynamodb.updates[0]['update_expression'] == 'REMOVE activeKey, activeStatus'
+    assert dynamodb.updates[0]['expression_values'] == {':old': 'DELIVERED'}
+    assert dynamodb.updates[0]['condition_expression'] == '#s = :old'
+
+
+def test_backfill_treats_orders_without_status_as_terminal():
+    dynamodb = FakeDynamoDB([pedido(
+        'o3', currentStep='DELIVERY', createdAt='2025-11-10T04:29:43', activeKey='k', activeStatus='s'
+    )])
+
+    backfill(dynamodb)
+
+    update = dynamodb.updates[0]
+    assert update['update_expression'] == 'SET createdDay = :day, countedInTotal = :counted REMOVE activeKey, activeStatus'
+    assert ':status' not in update['expression_values']
+    assert update['condition_expression'].startswith('attribute_not_exists(#s)')
+
+
+def test_backfill_skips_orders_changed_since_scan():
+    dynamodb = FakeDynamoDB(
+        [pedido('o6', status='CREATED'), pedido('o7', status='COOKING')],
+        cambiados={'TENANT#pardos#ORDER#o6'}
+    )
+
+    assert backfill(dynamodb) == (2, 1)
+    assert dynamodb.contados == {'pardos': 1}
+
+
+def test_backfill_skips_orders_already_indexed():
+    dynamodb = FakeDynamoDB([pedido(
+        'o4', status='CREATED', createdAt='2025-11-10T00:00:00', createdDay='TENANT#pardos#DAY#2025-11-10',
+        activeKey='TENANT#pardos#ACTIVE', activeStatus='CREATED#o4', countedInTotal=True
+    )])
+
+    assert backfill(dynamodb, dry_run=False) == (1, 0)
+    assert dynamodb.updates == []
+    assert dynamodb.contados == {}
+
+
+def test_backfill_dry_run_does_not_count():
+    dynamodb = FakeDynamoDB([pedido('o5', status='DELIVERED', createdDay='x')])
+
+    assert backfill(dynamodb, dry_run=True) == (1, 1)
+    assert dynamodb.updates == []
+    assert dynamodb.contados == {}
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from dashboard import handler
+
+
+def orden(order_id, **attrs):
+    item = {'PK': {'S': f"TENANT#pardos#ORDER#{order_id}"}}
+    item.update(attrs)
+    return item
+
+
+@pytest.fixture
+def dynamodb(stub_client, monkeypatch):
+    monkeypatch.setattr(handler.dynamodb, 'client', stub_client)
+    return stub_client
+
+
+def pedidos(response):
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])['pedidos']
+
+
+def test_obtener_pedidos_projects_fields_in_dynamodb(dynamodb):
+    dynamodb.responses['query'] = [{'Items': [orden(
+        'o1', items={'L': [{'M': {'name': {'S': 'Pollo a la brasa'}, 'price': {'N': '45.90'}}}]}
+    )], 'Count': 1}]
+
+    response = handler.obtener_pedidos({'queryStringParameters': {'fields': 'orderId,items.name'}}, None)
+
+    assert pedidos(response) == [{'orderId': 'o1', 'items': [{'name': 'Pollo a la brasa'}]}]
+    params = dynamodb.sent('query')[0]
+    assert params['IndexName'] == 'ActiveOrdersIndex'
+    assert params['Limit'] == 50
+    assert params['ProjectionExpression'] == '#p0, #p1'
+    assert params['ExpressionAttributeNames'] == {'#p0': 'items', '#p1': 'PK'}
+    # Sin etapas en fields no se consulta la tabla de pasos
+    assert len(dynamodb.calls) == 1
+
+
+def test_obtener_pedidos_projects_step_subfields(dynamodb):
+    dynamodb.responses['query'] = [
+        {'Items': [orden('o1', status={'S': 'COOKING'})], 'Count': 1},
+        {'Items': [{'stepName': {'S': 'COOKING'}}], 'Count': 1}
+    ]
+
+    response = handler.obtener_pedidos({'queryStringParameters': {'fields': 'status,etapas.stepName'}}, None)
+
+    assert pedidos(response) == [{'status': 'COOKING', 'etapas': [{'stepName': 'COOKING'}]}]
+    pasos = dynamodb.sent('query')[1]
+    assert pasos['KeyConditionExpression'] == 'PK = :pk AND begins_with(SK, :sk)'
+    assert pasos['ExpressionAttributeNames'] == {'#p0': 'stepName'}
+
+
+def test_obtener_pedidos_by_date_range_hides_index_attributes(dynamodb):
+    dynamodb.responses['query'] = [{'Items': [orden(
+        'o2', SK={'S': 'METADATA'}, status={'S': 'DELIVERED'}, createdDay={'S': 'TENANT#pardos#DAY#2025-11-10'}
+    )], 'Count': 1}]
+
+    response = handler.obtener_pedidos({'queryStringParameters': {
+        'desde': '2025-11-10', 'hasta': '2025-11-10'
+    }}, None)
+
+    # Sin fields se devuelven las etapas y no las claves internas
+    assert pedidos(response) == [{'orderId': 'o2', 'status': 'DELIVERED', 'etapas': []}]
+    params = dynamodb.sent('query')[0]
+    assert params['IndexName'] == 'OrdersByDateIndex'
+    assert params['ExpressionAttributeValues'][':end'] == {'S': '2025-11-10T23:59:59.999999'}
+
+
+def test_pedidos_por_estado_counts_active_orders_and_delivered_today(dynamodb):
+    dynamodb.responses['query'] = [
+        {'Items': [{'status': {'S': 'COOKING'}}, {'status': {'S': 'COOKING'}}, {'status': {'S': 'DELIVERY'}}]},
+        {'Items': [{'status': {'S': 'DELIVERED'}}, {'status': {'S': 'COOKING'}}]}
+    ]
+
+    assert handler.obtener_pedidos_por_estado('pardos') == {
+        'CREATED': 0, 'COOKING': 2, 'PACKAGING': 0, 'DELIVERY': 1, 'entregadosHoy': 1
+    }
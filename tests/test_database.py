@@ -0,0 +1,106 @@
+import pytest
+
+from shared.database import DynamoDB, utc_isoformat
+
+
+def database(stub_client):
+    db = DynamoDB()
+    db.client = stub_client
+    return db
+
+
+def test_query_pushes_top_level_fields_into_projection(stub_client):
+    database(stub_client).query(
+        table_name='orders',
+        key_condition_expression='PK = :pk',
+        expression_attribute_values={':pk': 'TENANT#pardos#ORDER#o1'},
+        fields=['items.name', 'status']
+    )
+
+    params = stub_client.sent('query')[0]
+    assert params['ProjectionExpression'] == '#p0, #p1'
+    assert params['ExpressionAttributeNames'] == {'#p0': 'items', '#p1': 'status'}
+
+
+def test_query_follows_last_evaluated_key_without_limit(stub_client):
+    stub_client.responses['query'] = [
+        {'Items': [{'PK': {'S': 'a'}}], 'Count': 1, 'LastEvaluatedKey': {'PK': {'S': 'a'}}},
+        {'Items': [{'PK': {'S': 'b'}}], 'Count': 1}
+    ]
+
+    response = database(stub_client).query('orders', 'PK = :pk', {':pk': 'x'})
+
+    assert response == {'Items': [{'PK': 'a'}, {'PK': 'b'}], 'Count': 2}
+    enviados = stub_client.sent('query')
+    assert 'ExclusiveStartKey' not in enviados[0]
+    assert enviados[1]['ExclusiveStartKey'] == {'PK': {'S': 'a'}}
+
+
+def test_query_with_limit_reads_a_single_page(stub_client):
+    stub_client.responses['query'] = [
+        {'Items': [{'PK': {'S': 'a'}}], 'Count': 1, 'LastEvaluatedKey': {'PK': {'S': 'a'}}}
+    ]
+
+    response = database(stub_client).query('orders', 'PK = :pk', {':pk': 'x'}, limit=1)
+
+    assert response['Count'] == 1
+    assert len(stub_client.sent('query')) == 1
+
+
+def test_query_active_orders_uses_sparse_index(stub_client):
+    db = database(stub_client)
+
+    db.query_active_orders('pardos', select='COUNT')
+    db.query_active_orders('pardos', status='COOKING')
+
+    todos, cocinando = stub_client.sent('query')
+    assert todos['IndexName'] == 'ActiveOrdersIndex'
+    assert todos['KeyConditionExpression'] == 'activeKey = :ak'
+    assert todos['ExpressionAttributeValues'] == {':ak': {'S': 'TENANT#pardos#ACTIVE'}}
+    assert todos['Select'] == 'COUNT'
+    assert cocinando['KeyConditionExpression'] == 'activeKey = :ak AND begins_with(activeStatus, :st)'
+    assert cocinando['ExpressionAttributeValues'][':st'] == {'S': 'COOKING#'}
+
+
+def test_query_orders_between_queries_each_day(stub_client):
+    stub_client.responses['query'] = [{'Count': 2}, {'Count': 0}, {'Count': 3}]
+
+    response = database(stub_client).query_orders_between(
+        'pardos', '2025-11-30T20:00:00', '2025-12-02T08:00:00', select='COUNT'
+    )
+
+    assert response['Count'] == 5
+    enviados = stub_client.sent('query')
+    assert [q['ExpressionAttributeValues'][':day']['S'] for q in enviados] == [
+        'TENANT#pardos#DAY#2025-11-30',
+        'TENANT#pardos#DAY#2025-12-01',
+        'TENANT#pardos#DAY#2025-12-02'
+    ]
+    assert all(q['IndexName'] == 'OrdersByDateIndex' for q in enviados)
+    assert enviados[0]['ExpressionAttributeValues'][':start'] == {'S': '2025-11-30T20:00:00'}
+    assert enviados[0]['ExpressionAttributeValues'][':end'] == {'S': '2025-12-02T08:00:00'}
+
+
+def test_query_orders_between_stops_at_limit(stub_client):
+    stub_client.responses['query'] = [{'Items': [{'PK': {'S': 'a'}}, {'PK': {'S': 'b'}}], 'Count': 2}]
+
+    response = database(stub_client).query_orders_between('pardos', '2025-11-10', '2025-11-12', limit=2)
+
+    assert response['Count'] == 2
+    assert len(stub_client.sent('query')) == 1
+
+
+def test_query_orders_between_empty_when_start_after_end(stub_client):
+    response = database(stub_client).query_orders_between('pardos', '2025-11-12', '2025-11-10')
+
+    assert response == {'Items': [], 'Count': 0}
+    assert stub_client.calls == []
+
+
+def test_utc_isoformat_converts_offsets_to_utc():
+    # 22:30 en Lima (-05:00) ya es el día siguiente en UTC
+    assert utc_isoformat('2025-11-10T22:30:00-05:00') == '2025-11-11T03:30:00'
+    assert utc_isoformat('2025-11-10T04:29:43.856279Z') == '2025-11-10T04:29:43.856279'
+    assert utc_isoformat('2025-11-10T04:29:43') == '2025-11-10T04:29:43'
+    with pytest.raises(ValueError):
+        utc_isoformat('ayer')
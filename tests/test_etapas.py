@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from etapas import handler
+
+
+@pytest.fixture
+def dynamodb(stub_client, monkeypatch):
+    monkeypatch.setattr(handler.dynamodb, 'client', stub_client)
+    return stub_client
+
+
+def evento(stage, order_id='o1'):
+    return {'body': json.dumps({'orderId': order_id, 'tenantId': 'pardos', 'stage': stage})}
+
+
+@pytest.mark.parametrize('stage', ['CREATED', 'DELIVERED', 'COCINANDO'])
+def test_iniciar_etapa_rejects_invalid_stage(dynamodb, stage):
+    response = handler.iniciar_etapa(evento(stage), None)
+
+    assert response['statusCode'] == 400
+    assert dynamodb.calls == []
+
+
+def test_iniciar_etapa_unknown_order_returns_404_without_writing(dynamodb):
+    dynamodb.responses['update_item'] = [
+        ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+    ]
+
+    response = handler.iniciar_etapa(evento('COOKING', order_id='nope'), None)
+
+    assert response['statusCode'] == 404
+    assert dynamodb.sent('update_item')[0]['ConditionExpression'] == 'attribute_exists(PK)'
+    assert dynamodb.sent('put_item') == []
+
+
+def test_actualizar_estado_pedido_sets_active_index_attributes(dynamodb):
+    handler.actualizar_estado_pedido('pardos', 'o1', 'PACKAGING', current_step='PACKAGING')
+
+    update = dynamodb.sent('update_item')[0]
+    assert update['UpdateExpression'] == (
+        'SET #s = :status, updatedAt = :now, currentStep = :step, activeKey = :ak, activeStatus = :as'
+    )
+    assert update['ExpressionAttributeValues'][':ak'] == {'S': 'TENANT#pardos#ACTIVE'}
+    assert update['ExpressionAttributeValues'][':as'] == {'S': 'PACKAGING#o1'}
+    assert update['ExpressionAttributeNames'] == {'#s': 'status'}
+
+
+def test_actualizar_estado_pedido_removes_terminal_orders_from_index(dynamodb):
+    handler.actualizar_estado_pedido('pardos', 'o1', 'DELIVERED')
+
+    update = dynamodb.sent('update_item')[0]
+    assert update['UpdateExpression'] == 'SET #s = :status, updatedAt = :now REMOVE activeKey, activeStatus'
+    assert set(update['ExpressionAttributeValues']) == {':status', ':now'}
+    assert update['ConditionExpression'] == 'attribute_exists(PK)'
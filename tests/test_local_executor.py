@@ -0,0 +1,47 @@
+from etapas import handler as etapas
+from orquestador import handler as orquestador
+from orquestador.local_executor import LocalStateMachine, run_load_test
+
+
+def test_load_test_runs_full_lifecycle_including_orchestrator():
+    reporte = run_load_test(orders=50, arrival_rate=5, seed=1)
+
+    assert reporte['completed'] == 50
+    assert reporte['failed'] == {}
+    assert set(reporte['stages']) == {'Cocinar', 'Empacar', 'Entregar'}
+    assert set(reporte['orderCreated']) == {'handlerP50Ms', 'handlerP95Ms'}
+    assert reporte['awsCalls']['events.put_events'] == 50 * 4
+    assert reporte['awsCallsPerOrder'] == sum(reporte['awsCalls'].values()) / 50
+
+
+def test_stage_longer_than_timeout_fails_execution():
+    reporte = run_load_test(orders=20, seed=1, stage_seconds={'COOKING': 5000}, spread=0)
+
+    assert reporte['completed'] == 0
+    assert reporte['failed'] == {'States.Timeout': 20}
+
+
+def test_duplicate_order_created_does_not_reset_order():
+    machine = LocalStateMachine.from_file(seed=1)
+    evento = {'detail': {'orderId': 'o1', 'customerId': 'c1'}}
+
+    with machine.fakes():
+        orquestador.iniciar_orquestacion(evento, None)
+        pedido = machine.dynamodb.tables['local-orders']['TENANT#pardos#ORDER#o1']['METADATA']
+        pedido['status'] = {'S': 'DELIVERED'}
+
+        assert orquestador.iniciar_orquestacion(evento, None)['statusCode'] == 200
+    assert pedido['status'] == {'S': 'DELIVERED'}
+    # El duplicado no vuelve a sumar al contador del tenant
+    contador = machine.dynamodb.tables['local-orders']['TENANT#pardos#STATS']['ORDER_COUNT']
+    assert contador['totalPedidos'] == {'N': '1'}
+
+
+def test_run_restores_handler_clients():
+    originales = [(w, w.client, w.retry) for w in (orquestador.dynamodb, orquestador.events, etapas.dynamodb, etapas.events)]
+
+    run_load_test(orders=2, seed=1)
+
+    for wrapper, client, retry in originales:
+        assert wrapper.client is client
+        assert wrapper.retry is retry
@@ -0,0 +1,46 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from orquestador import handler
+
+
+@pytest.fixture
+def dynamodb(stub_client, monkeypatch):
+    monkeypatch.setattr(handler.dynamodb, 'client', stub_client)
+    return stub_client
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': 400}}, 'UpdateItem')
+
+
+def test_registrar_pedido_inserts_once_and_counts(dynamodb):
+    handler.registrar_pedido('pardos', 'o1', 'c1', '2025-11-11T03:30:00')
+
+    registro, contador = dynamodb.sent('update_item')
+    assert registro['ConditionExpression'] == 'attribute_not_exists(PK)'
+    assert registro['Key'] == {'PK': {'S': 'TENANT#pardos#ORDER#o1'}, 'SK': {'S': 'METADATA'}}
+    assert registro['ExpressionAttributeValues'][':day'] == {'S': 'TENANT#pardos#DAY#2025-11-11'}
+    assert registro['ExpressionAttributeValues'][':as'] == {'S': 'CREATED#o1'}
+    assert contador['Key'] == {'PK': {'S': 'TENANT#pardos#STATS'}, 'SK': {'S': 'ORDER_COUNT'}}
+    assert contador['UpdateExpression'] == 'ADD totalPedidos :n'
+
+
+def test_registrar_pedido_duplicate_is_ignored_and_not_counted(dynamodb):
+    dynamodb.responses['update_item'] = [client_error('ConditionalCheckFailedException')]
+
+    handler.registrar_pedido('pardos', 'o1', 'c1', '2025-11-11T03:30:00')
+
+    assert len(dynamodb.sent('update_item')) == 1
+
+
+def test_registrar_pedido_propagates_other_errors(dynamodb):
+    dynamodb.responses['update_item'] = [client_error('ValidationException')]
+
+    with pytest.raises(ClientError):
+        handler.registrar_pedido('pardos', 'o1', 'c1', '2025-11-11T03:30:00')
+
+
+def test_fecha_creacion_uses_utc_day():
+    assert handler.fecha_creacion({'createdAt': '2025-11-10T22:30:00-05:00'}) == '2025-11-11T03:30:00'
+    assert handler.fecha_creacion({'createdAt': 'ayer'})[:2] == '20'
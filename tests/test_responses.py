@@ -0,0 +1,48 @@
+import json
+from decimal import Decimal
+
+from shared.responses import dumps, parse_fields, project, respuesta
+
+PEDIDO = {
+    'orderId': 'o1',
+    'status': 'COOKING',
+    'items': [
+        {'name': 'Pollo a la brasa', 'price': Decimal('45.90')},
+        {'name': 'Inca Kola 1L', 'price': Decimal('8.50')}
+    ]
+}
+
+
+def test_parse_fields():
+    assert parse_fields({'queryStringParameters': {'fields': 'orderId, items.name,'}}) == ['orderId', 'items.name']
+    assert parse_fields({'queryStringParameters': None}) is None
+    assert parse_fields({'queryStringParameters': {'fields': ' , '}}) is None
+
+
+def test_project_nested_list_paths():
+    assert project(PEDIDO, ['orderId', 'items.name']) == {
+        'orderId': 'o1',
+        'items': [{'name': 'Pollo a la brasa'}, {'name': 'Inca Kola 1L'}]
+    }
+
+
+def test_project_parent_path_wins_over_child_in_any_order():
+    assert project(PEDIDO, ['items', 'items.name']) == {'items': PEDIDO['items']}
+    assert project(PEDIDO, ['items.name', 'items']) == {'items': PEDIDO['items']}
+
+
+def test_project_without_fields_returns_everything():
+    assert project(PEDIDO, None) is PEDIDO
+
+
+def test_dumps_is_compact_and_handles_decimal():
+    assert dumps({'a': Decimal('2'), 'b': Decimal('8.50')}) == '{"a":2,"b":8.5}'
+
+
+def test_respuesta_includes_cors_headers():
+    response = respuesta(503, {'error': 'x'}, {'Retry-After': '1'})
+
+    assert response['statusCode'] == 503
+    assert response['headers']['Access-Control-Allow-Origin'] == '*'
+    assert response['headers']['Retry-After'] == '1'
+    assert json.loads(response['body']) == {'error': 'x'}
@@ -0,0 +1,238 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from shared import retry
+from shared.events import EventBridge
+from shared.retry import (
+    DeadlineExceededError,
+    RetryPolicy,
+    RetryStats,
+    ThrottledError,
+    TokenBucket,
+    begin_invocation,
+)
+
+
+class FakeClock:
+    """Reloj simulado: sleep avanza el tiempo en lugar de esperar"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def client_error(code, status=400):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'Op')
+
+
+def failing(error, clock=None, cost=0.0):
+    calls = []
+
+    def fn():
+        calls.append(clock() if clock else None)
+        if clock:
+            clock.now += cost
+        raise error
+
+    return fn, calls
+
+
+@pytest.fixture(autouse=True)
+def sin_invocacion():
+    retry.invocation_deadline = None
+    yield
+    retry.invocation_deadline = None
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def policy(clock, **kwargs):
+    kwargs.setdefault('stats', RetryStats())
+    return RetryPolicy(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_bucket_halves_on_throttle_and_recovers_additively(clock):
+    bucket = TokenBucket(rate=40, min_rate=1, max_rate=42, clock=clock, sleep=clock.sleep)
+
+    bucket.on_throttle()
+    assert bucket.rate == 20
+    bucket.on_throttle()
+    assert bucket.rate == 10
+
+    bucket.on_success()
+    bucket.on_success()
+    assert bucket.rate == 12
+
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 42
+
+    for _ in range(20):
+        bucket.on_throttle()
+    assert bucket.rate == 1
+
+
+def test_bucket_waits_for_refill_or_gives_up_at_deadline(clock):
+    bucket = TokenBucket(rate=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(deadline=10)
+    assert bucket.acquire(deadline=10)
+
+    assert bucket.acquire(deadline=10)
+    assert clock.now == pytest.approx(0.5)
+
+    assert not bucket.acquire(deadline=clock.now + 0.1)
+
+
+def test_retries_stop_at_max_attempts(clock):
+    stats = RetryStats()
+    fn, calls = failing(client_error('InternalServerError', 500))
+
+    with pytest.raises(ClientError):
+        policy(clock, max_attempts=3, stats=stats).call('op', fn)
+
+    assert len(calls) == 3
+    assert stats.snapshot()['op'] == {'calls': 3, 'retries': 2, 'throttles': 0, 'errors': 1, 'deadlines': 0}
+
+
+def test_success_after_transient_errors(clock):
+    errores = [client_error('ServiceUnavailable', 503)]
+
+    def fn():
+        if errores:
+            raise errores.pop()
+        return 'ok'
+
+    assert policy(clock).call('op', fn) == 'ok'
+
+
+def test_throttle_raises_throttled_error_and_slows_bucket(clock):
+    stats = RetryStats()
+    bucket = TokenBucket(rate=40, clock=clock, sleep=clock.sleep)
+    fn, calls = failing(client_error('ThrottlingException'))
+
+    with pytest.raises(ThrottledError) as info:
+        policy(clock, max_attempts=4, bucket=bucket, stats=stats).call('op', fn)
+
+    assert info.value.operation == 'op'
+    assert len(calls) == 4
+    assert stats.snapshot()['op']['throttles'] == 4
+    assert bucket.rate == 2.5
+
+
+def test_non_retryable_error_propagates_without_retry(clock):
+    stats = RetryStats()
+    error = client_error('ValidationException')
+    fn, calls = failing(error)
+
+    with pytest.raises(ClientError) as info:
+        policy(clock, stats=stats).call('op', fn)
+
+    assert info.value is error
+    assert len(calls) == 1
+    assert stats.snapshot()['op']['retries'] == 0
+
+
+def test_programming_errors_are_not_retried(clock):
+    fn, calls = failing(KeyError('x'))
+
+    with pytest.raises(KeyError):
+        policy(clock).call('op', fn)
+
+    assert len(calls) == 1
+
+
+def test_no_attempt_starts_unless_full_timeout_fits_before_deadline(clock):
+    fn, calls = failing(client_error('InternalServerError', 500), clock=clock, cost=6.0)
+
+    with pytest.raises(DeadlineExceededError):
+        policy(clock, max_attempts=10, deadline=20, attempt_timeout=7).call('op', fn)
+
+    # Cada intento arranca con tiempo para su timeout completo, y el último
+    # termina antes del deadline aunque tarde todo lo que botocore permite
+    assert calls
+    assert all(inicio + 7 <= 20 for inicio in calls)
+    assert clock.now <= 20
+
+
+def test_invocation_budget_is_shared_across_operations(clock):
+    begin_invocation(FakeContext(remaining_ms=12000), clock=clock)
+    pol = policy(clock, deadline=25, attempt_timeout=7)
+
+    def lenta():
+        clock.now += 5
+        return 'ok'
+
+    assert pol.call('primera', lenta) == 'ok'
+
+    # Quedan 11 - 5 = 6s de presupuesto: no cabe un intento de 7s
+    with pytest.raises(DeadlineExceededError):
+        pol.call('segunda', lenta)
+    assert clock.now == 5
+
+
+def test_begin_invocation_resets_stats():
+    retry.retry_stats.incr('op', 'calls')
+    begin_invocation(None)
+
+    assert retry.retry_stats.snapshot() == {}
+    assert retry.invocation_deadline is None
+
+
+class FakeEventsClient:
+    def __init__(self, codes):
+        self.codes = list(codes)
+        self.sent = []
+
+    def put_events(self, Entries):
+        self.sent.append(list(Entries))
+        code = self.codes.pop(0) if self.codes else None
+        if code is None:
+            return {'FailedEntryCount': 0, 'Entries': [{'EventId': '1'} for _ in Entries]}
+        return {'FailedEntryCount': len(Entries), 'Entries': [{'ErrorCode': code, 'ErrorMessage': code} for _ in Entries]}
+
+
+@pytest.fixture
+def events(clock, monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    stats = RetryStats()
+    bridge = EventBridge(retry_policy=policy(clock, max_attempts=3, stats=stats))
+    bridge.stats = stats
+    return bridge
+
+
+def test_failed_event_entries_are_retried(events):
+    events.client = FakeEventsClient(['InternalFailure', None])
+
+    response = events.publish_event('pardos.test', 'Test', {'a': 1})
+
+    assert response['FailedEntryCount'] == 0
+    assert len(events.client.sent) == 2
+    assert events.client.sent[0] == events.client.sent[1]
+    assert events.stats.snapshot()['events.put_events']['retries'] == 1
+
+
+def test_throttled_event_entries_raise_throttled_error(events):
+    events.client = FakeEventsClient(['ThrottlingException'] * 3)
+
+    with pytest.raises(ThrottledError):
+        events.publish_event('pardos.test', 'Test', {'a': 1})
+
+    assert events.stats.snapshot()['events.put_events']['throttles'] == 3